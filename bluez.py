@@ -0,0 +1,633 @@
+"""
+Anbindung an den BlueZ-Daemon über den System-D-Bus.
+
+Statt pro Prüfung einen Prozess zu starten, hält der Client eine einzige
+Verbindung zu org.bluez offen und liest die Device1-Properties der bekannten
+Objektpfade direkt aus. Zusätzlich abonniert er die PropertiesChanged- und
+InterfacesAdded-Signale, sodass BlueZ Sichtungen selbst meldet.
+
+Ist dbus-next nicht installiert oder der Modus "bluetoothctl" gewählt, übernimmt
+eine dauerhafte bluetoothctl-Sitzung (BluetoothScanner) beide Aufgaben über ihre
+stdin/stdout-Pipes.
+
+Kann der Prozess einen HCI-Socket öffnen, liest HciAdvertisementWatcher die
+LE-Advertising-Reports während des bluetoothctl-Scans direkt vom Controller;
+die Textausgabe muss dann nicht mehr nach Sichtungen durchsucht werden.
+
+Für das aktive Anpingen klassischer Geräte schickt ClassicHciProber einen
+Remote Name Request direkt über einen HCI-Socket an den Controller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import errno
+import logging
+import os
+import queue
+import re
+import select
+import selectors
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+try:
+    from dbus_next import BusType, Message, MessageType, Variant
+    from dbus_next.aio import MessageBus
+except ImportError:
+    BusType = Message = MessageType = Variant = MessageBus = None
+
+
+BLUEZ_SERVICE = "org.bluez"
+ADAPTER_PATH = "/org/bluez/hci0"
+ADAPTER_INTERFACE = "org.bluez.Adapter1"
+DEVICE_INTERFACE = "org.bluez.Device1"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+OBJECT_MANAGER_INTERFACE = "org.freedesktop.DBus.ObjectManager"
+
+AF_BLUETOOTH = getattr(socket, "AF_BLUETOOTH", 31)
+BTPROTO_HCI = getattr(socket, "BTPROTO_HCI", 1)
+SOL_HCI = getattr(socket, "SOL_HCI", 0)
+HCI_FILTER = getattr(socket, "HCI_FILTER", 2)
+HCI_COMMAND_PKT = 0x01
+HCI_EVENT_PKT = 0x04
+EVT_REMOTE_NAME_REQ_COMPLETE = 0x07
+EVT_CMD_STATUS = 0x0F
+EVT_LE_META = 0x3E
+LE_ADVERTISING_REPORT = 0x02
+LE_EXT_ADVERTISING_REPORT = 0x0D
+OPCODE_REMOTE_NAME_REQ = (0x01 << 10) | 0x0019
+OPCODE_REMOTE_NAME_REQ_CANCEL = (0x01 << 10) | 0x001A
+# Länger als der Standard-Page-Timeout des Controllers (5,12 s): spätestens
+# dann meldet er einen abgebrochenen Name Request als abgeschlossen.
+NAME_REQ_CANCEL_TIMEOUT = 6.0
+
+ANSI_ESCAPE = re.compile(rb"\x1b\[[0-9;]*[A-Za-z]|[\x01\x02]")
+
+def mac_to_int(mac) -> int:
+    # Hex-Parsing ist unabhängig von Groß-/Kleinschreibung; str und bytes gehen.
+    if isinstance(mac, bytes):
+        return int(mac.translate(None, b":"), 16)
+    return int(mac.replace(":", ""), 16)
+
+
+def device_path(mac: str, adapter_path: str = ADAPTER_PATH) -> str:
+    return f"{adapter_path}/dev_{mac.upper().replace(':', '_')}"
+
+
+def signal_match_rules(paths) -> list:
+    # Eine Regel pro Zielgerät: dbus-daemon filtert die RSSI-Signale fremder
+    # Geräte selbst, statt jedes davon zum Entpacken hierher zu schicken.
+    rules = []
+    for path in paths:
+        rules.append(
+            f"type='signal',sender='{BLUEZ_SERVICE}',interface='{PROPERTIES_INTERFACE}',"
+            f"member='PropertiesChanged',path='{path}',arg0='{DEVICE_INTERFACE}'"
+        )
+        rules.append(
+            f"type='signal',sender='{BLUEZ_SERVICE}',interface='{OBJECT_MANAGER_INTERFACE}',"
+            f"member='InterfacesAdded',arg0path='{path}'"
+        )
+    return rules
+
+
+def create_client(macs, mode: str = "auto"):
+    # mode: "auto" (D-Bus, sonst bluetoothctl), "dbus" oder "bluetoothctl".
+    if mode not in ("auto", "dbus", "bluetoothctl"):
+        logging.warning("Unbekannter Scan-Modus '%s' – nutze auto.", mode)
+        mode = "auto"
+    if mode != "bluetoothctl":
+        if MessageBus is not None:
+            return BluezClient(macs)
+        logging.warning("dbus-next nicht installiert – nutze dauerhafte bluetoothctl-Sitzung.")
+    return BluetoothScanner(macs)
+
+
+class BluezClient:
+    def __init__(self, macs, adapter_path: str = ADAPTER_PATH):
+        self.adapter_path = adapter_path
+        self.paths = {mac: device_path(mac, adapter_path) for mac in macs}
+        self.macs_by_path = {path: mac for mac, path in self.paths.items()}
+        self._on_seen = None
+        self._loop = None
+        self._bus = None
+        self._connect_task = None
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        if MessageBus is None:
+            return False
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="bluez-dbus", daemon=True
+                ).start()
+        return True
+
+    def stop(self) -> None:
+        if self._loop is not None and self._bus is not None:
+            self._loop.call_soon_threadsafe(self._bus.disconnect)
+
+    def start_discovery(self, on_seen) -> None:
+        if self._loop is None:
+            return
+        self._on_seen = on_seen
+        future = asyncio.run_coroutine_threadsafe(self._connect(), self._loop)
+        future.add_done_callback(self._log_connect_result)
+
+    @staticmethod
+    def _log_connect_result(future) -> None:
+        exc = future.exception()
+        if exc is not None:
+            logging.warning("D-Bus Verbindung zu %s fehlgeschlagen: %s", BLUEZ_SERVICE, exc)
+
+    async def _connect(self):
+        # Genau ein Verbindungsaufbau samt Subscribe; parallele Probes warten
+        # auf denselben Task. shield() verhindert, dass ein Probe-Timeout den
+        # halb fertigen Aufbau abbricht.
+        task = self._connect_task
+        if task is None or (
+            task.done()
+            and (task.cancelled() or task.exception() is not None or not task.result().connected)
+        ):
+            task = self._connect_task = asyncio.ensure_future(self._open_bus())
+        return await asyncio.shield(task)
+
+    async def _open_bus(self):
+        bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+        self._bus = bus
+        logging.debug("D-Bus Verbindung zu %s hergestellt", BLUEZ_SERVICE)
+        if self._on_seen is not None:
+            try:
+                await self._subscribe(bus)
+            except Exception as exc:
+                logging.warning("BlueZ Discovery konnte nicht gestartet werden: %s", exc)
+        return bus
+
+    async def _call(self, bus, message):
+        reply = await bus.call(message)
+        if reply.message_type == MessageType.ERROR:
+            raise RuntimeError(f"{message.member}: {reply.error_name} {reply.body}")
+        return reply
+
+    async def _subscribe(self, bus) -> None:
+        bus.add_message_handler(self._on_message)
+        for rule in signal_match_rules(self.macs_by_path):
+            await self._call(
+                bus,
+                Message(
+                    destination="org.freedesktop.DBus",
+                    path="/org/freedesktop/DBus",
+                    interface="org.freedesktop.DBus",
+                    member="AddMatch",
+                    signature="s",
+                    body=[rule],
+                ),
+            )
+        # Nur LE scannen: eine BR/EDR-Inquiry würde die hcitool-Pages blockieren.
+        # DuplicateData bleibt an: mit Duplikatfilter meldet der Controller ein
+        # Gerät nur einmal pro Scan, device_last_seen würde nach
+        # passive_seen_window veralten und jeder Zyklus müsste pagen. Dank der
+        # Pfad-Regeln kommen die Wiederholungen nur noch für Zielgeräte an.
+        await self._call(
+            bus,
+            Message(
+                destination=BLUEZ_SERVICE,
+                path=self.adapter_path,
+                interface=ADAPTER_INTERFACE,
+                member="SetDiscoveryFilter",
+                signature="a{sv}",
+                body=[{"Transport": Variant("s", "le"), "DuplicateData": Variant("b", True)}],
+            ),
+        )
+        await self._call(
+            bus,
+            Message(
+                destination=BLUEZ_SERVICE,
+                path=self.adapter_path,
+                interface=ADAPTER_INTERFACE,
+                member="StartDiscovery",
+            ),
+        )
+        logging.info("BlueZ Discovery aktiv – Sichtungen kommen per D-Bus-Signal.")
+
+    def _on_message(self, message) -> None:
+        if message.message_type != MessageType.SIGNAL:
+            return
+        if message.member == "PropertiesChanged":
+            path = message.path
+            changed = message.body[1]
+            connected = changed.get("Connected")
+            if "RSSI" not in changed and not (connected is not None and connected.value):
+                return
+        elif message.member == "InterfacesAdded":
+            path, interfaces = message.body
+            props = interfaces.get(DEVICE_INTERFACE)
+            if props is None or "RSSI" not in props:
+                return
+        else:
+            return
+        mac = self.macs_by_path.get(path)
+        if mac is not None:
+            self._on_seen(mac)
+
+    async def _get_device_properties(self, mac: str):
+        bus = await self._connect()
+        reply = await bus.call(
+            Message(
+                destination=BLUEZ_SERVICE,
+                path=self.paths[mac],
+                interface=PROPERTIES_INTERFACE,
+                member="GetAll",
+                signature="s",
+                body=[DEVICE_INTERFACE],
+            )
+        )
+        if reply.message_type == MessageType.ERROR:
+            # Unbekanntes Objekt: BlueZ hat das Gerät (noch) nicht gesehen.
+            logging.debug("BlueZ kennt %s nicht: %s", mac, reply.error_name)
+            return None
+        return reply.body[0]
+
+    def probe(self, mac: str, timeout: float) -> bool:
+        if self._loop is None:
+            return False
+        future = asyncio.run_coroutine_threadsafe(self._get_device_properties(mac), self._loop)
+        try:
+            props = future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logging.debug("Timeout bei BlueZ D-Bus Abfrage für %s", mac)
+            return False
+        except Exception as exc:
+            logging.debug("BlueZ D-Bus Abfrage fehlgeschlagen (%s): %s", mac, exc)
+            return False
+        if not props:
+            return False
+        # RSSI bleibt bei laufender Discovery für gepairte Geräte stehen und
+        # sagt nichts über eine aktuelle Sichtung; die kommt per Signal.
+        connected = props.get("Connected")
+        return connected is not None and bool(connected.value)
+
+
+class BluetoothScanner:
+    def __init__(self, macs, restart_delay: float = 5.0):
+        self.targets = {mac_to_int(mac): mac for mac in macs}
+        # Eine Alternation über alle Ziel-MACs: ein search() pro Zeile statt
+        # MAC-Suche, upper()-Kopie und Dict-Lookup.
+        self._target_re = re.compile(
+            b"|".join(re.escape(mac.encode()) for mac in macs), re.IGNORECASE
+        )
+        self.restart_delay = restart_delay
+        self.process = None
+        self._on_seen = None
+        self._watcher = HciAdvertisementWatcher(macs)
+        self._hci_sightings = False
+        self._responses = None
+        self._query_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        threading.Thread(target=self.run, name="bluetoothctl", daemon=True).start()
+        return True
+
+    def start_discovery(self, on_seen) -> None:
+        # Vor dem Start setzen: stirbt der Watcher sofort, setzt on_exit es
+        # zurück, ohne dass die Zuweisung hier das wieder überschreibt.
+        self._hci_sightings = True
+        if not self._watcher.start(on_seen, on_exit=self._on_watcher_exit):
+            self._hci_sightings = False
+        self._on_seen = on_seen
+        if self.process is not None:
+            self._configure_controller()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._watcher.stop()
+        self._stop_process()
+
+    def _on_watcher_exit(self) -> None:
+        # Ohne HCI-Socket kommen Sichtungen wieder aus der bluetoothctl-Ausgabe.
+        if self._hci_sightings and not self._stop.is_set():
+            logging.warning("HCI-Sichtungen ausgefallen – werte bluetoothctl-Ausgabe aus.")
+        self._hci_sightings = False
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._start_process()
+            except FileNotFoundError:
+                logging.error("bluetoothctl nicht gefunden – Scanner deaktiviert.")
+                return
+            self._read_output()
+            self._stop_process()
+            if not self._stop.is_set():
+                logging.warning("bluetoothctl beendet – Neustart in %.0fs", self.restart_delay)
+                self._stop.wait(self.restart_delay)
+
+    def _read_output(self) -> None:
+        fd = self.process.stdout.fileno()
+        os.set_blocking(fd, False)
+        buf = bytearray()
+        # Fester Lesepuffer: os.readv füllt ihn direkt, ohne pro read() ein
+        # neues bytes-Objekt anzulegen.
+        chunk = bytearray(8192)
+        view = memoryview(chunk)
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while not self._stop.is_set():
+                if not selector.select(timeout=1.0):
+                    continue
+                # Bei Scan-Bursts alles Anstehende auf einmal abholen.
+                eof = False
+                while True:
+                    try:
+                        n = os.readv(fd, [chunk])
+                    except BlockingIOError:
+                        break
+                    if not n:
+                        eof = True
+                        break
+                    buf += view[:n]
+                start = 0
+                while (end := buf.find(b"\n", start)) >= 0:
+                    self._handle_line(bytes(buf[start:end]))
+                    start = end + 1
+                del buf[:start]
+                if eof:
+                    return
+
+    def _start_process(self) -> None:
+        self.process = subprocess.Popen(
+            ["bluetoothctl"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+        )
+        logging.debug("bluetoothctl gestartet (pid=%d)", self.process.pid)
+        if self._on_seen is not None:
+            self._configure_controller()
+
+    def _configure_controller(self) -> None:
+        # Nur LE scannen: eine BR/EDR-Inquiry würde die hcitool-Pages blockieren.
+        for command in ("menu scan", "transport le", "back", "scan on"):
+            self._send_command(command)
+
+    def _send_command(self, command: str) -> None:
+        process = self.process
+        if process is None:
+            return
+        try:
+            process.stdin.write(command.encode() + b"\n")
+        except (OSError, ValueError) as exc:
+            logging.debug("bluetoothctl Kommando '%s' fehlgeschlagen: %s", command, exc)
+
+    def _stop_process(self) -> None:
+        process = self.process
+        self.process = None
+        if process is None:
+            return
+        # Mit dem D-Bus-Client endet auch dessen Discovery-Sitzung in BlueZ,
+        # ein vorheriges "scan off" ist nicht nötig.
+        process.terminate()
+        try:
+            process.wait(timeout=1.5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def _handle_line(self, raw: bytes) -> None:
+        # Asynchrone Ausgaben überschreiben den Prompt per \r – nur der Rest zählt.
+        line = ANSI_ESCAPE.sub(b"", raw.rsplit(b"\r", 1)[-1]).strip()
+        responses = self._responses
+        if responses is not None:
+            responses.put(line)
+        if self._on_seen is None:
+            return
+        if b"[CHG] Device" in line and b"Connected: yes" in line:
+            seen = True
+        elif self._hci_sightings:
+            # Advertisements kommen bereits über den HCI-Socket.
+            seen = False
+        else:
+            seen = b"[NEW] Device" in line or (b"[CHG] Device" in line and b"RSSI" in line)
+        if seen:
+            mac = self._extract_mac(line)
+            if mac is not None:
+                self._on_seen(mac)
+
+    def _extract_mac(self, line: bytes):
+        match = self._target_re.search(line)
+        if match is None:
+            return None
+        return self.targets[mac_to_int(match.group(0))]
+
+    def probe(self, mac: str, timeout: float) -> bool:
+        if self.process is None:
+            return False
+        with self._query_lock:
+            responses = queue.Queue()
+            self._responses = responses
+            try:
+                # "version" dient als Endmarke, bluetoothctl kennt kein echo.
+                self._send_command(f"info {mac}")
+                self._send_command("version")
+                deadline = time.monotonic() + timeout
+                present = False
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logging.debug("Timeout bei bluetoothctl info für %s", mac)
+                        return False
+                    try:
+                        line = responses.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+                    if line.startswith(b"Version"):
+                        return present
+                    if line.endswith(b"not available"):
+                        return False
+                    # "RSSI:" ist nur der gecachte BlueZ-Wert, keine Sichtung.
+                    if line == b"Connected: yes":
+                        present = True
+            finally:
+                self._responses = None
+
+
+class HciAdvertisementWatcher:
+    def __init__(self, macs, dev_id: int = 0):
+        # Schlüssel ist die BD_ADDR so, wie sie im Event steht (little endian).
+        self.targets = {mac_to_int(mac).to_bytes(6, "little"): mac for mac in macs}
+        self.dev_id = dev_id
+        self._stop = threading.Event()
+
+    def start(self, on_seen, on_exit=None) -> bool:
+        try:
+            sock = socket.socket(AF_BLUETOOTH, socket.SOCK_RAW, BTPROTO_HCI)
+        except OSError as exc:
+            logging.info("HCI-Socket für Advertising-Reports nicht nutzbar (%s).", exc)
+            return False
+        try:
+            sock.bind((self.dev_id,))
+            # Der Kernel reicht nur LE-Meta-Events durch, alles andere bleibt dort.
+            sock.setsockopt(
+                SOL_HCI,
+                HCI_FILTER,
+                struct.pack("<IIIH", 1 << HCI_EVENT_PKT, 0, 1 << (EVT_LE_META - 32), 0),
+            )
+        except OSError as exc:
+            sock.close()
+            logging.info("HCI-Socket für Advertising-Reports nicht nutzbar (%s).", exc)
+            return False
+        threading.Thread(
+            target=self._run, args=(sock, on_seen, on_exit), name="hci-adv", daemon=True
+        ).start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, sock, on_seen, on_exit) -> None:
+        try:
+            with sock:
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([sock], [], [], 1.0)
+                    if not readable:
+                        continue
+                    try:
+                        packet = sock.recv(260)
+                    except OSError as exc:
+                        logging.warning("HCI-Socket für Advertising-Reports fehlgeschlagen: %s", exc)
+                        return
+                    for bdaddr in self._report_addresses(packet):
+                        mac = self.targets.get(bdaddr)
+                        if mac is not None:
+                            on_seen(mac)
+        finally:
+            if on_exit is not None:
+                on_exit()
+
+    @staticmethod
+    def _report_addresses(packet: bytes) -> list:
+        # packet: Typ, Event-Code, Länge, Subevent, Anzahl Reports, Reports...
+        if len(packet) < 5 or packet[1] != EVT_LE_META:
+            return []
+        subevent = packet[3]
+        if subevent == LE_ADVERTISING_REPORT:
+            # Event-Typ, Adresstyp, Adresse, Datenlänge, Daten, RSSI
+            header, addr_offset, length_offset, trailer = 9, 2, 8, 1
+        elif subevent == LE_EXT_ADVERTISING_REPORT:
+            # Event-Typ (2), Adresstyp, Adresse, PHYs/SID/TX/RSSI/Intervall,
+            # Direktadresse, Datenlänge, Daten
+            header, addr_offset, length_offset, trailer = 24, 3, 23, 0
+        else:
+            return []
+        addresses = []
+        pos = 5
+        for _ in range(packet[4]):
+            if pos + header > len(packet):
+                break
+            addresses.append(packet[pos + addr_offset:pos + addr_offset + 6])
+            pos += header + packet[pos + length_offset] + trailer
+        return addresses
+
+
+class ClassicHciProber:
+    def __init__(self, dev_id: int = 0):
+        self.dev_id = dev_id
+        self._sock = None
+        self._disabled = False
+
+    def _socket(self):
+        if self._sock is None:
+            sock = socket.socket(AF_BLUETOOTH, socket.SOCK_RAW, BTPROTO_HCI)
+            try:
+                sock.bind((self.dev_id,))
+                # Der Kernel reicht nur Command-Status- und Remote-Name-Events durch.
+                event_mask = (1 << EVT_REMOTE_NAME_REQ_COMPLETE) | (1 << EVT_CMD_STATUS)
+                sock.setsockopt(
+                    SOL_HCI, HCI_FILTER, struct.pack("<IIIH", 1 << HCI_EVENT_PKT, event_mask, 0, 0)
+                )
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        return self._sock
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    @staticmethod
+    def _command(opcode: int, params: bytes) -> bytes:
+        return struct.pack("<BHB", HCI_COMMAND_PKT, opcode, len(params)) + params
+
+    def probe(self, mac: str, timeout: float):
+        # None heißt: kein nutzbarer HCI-Socket, der Aufrufer muss selbst pagen.
+        if self._disabled:
+            return None
+        bdaddr = mac_to_int(mac).to_bytes(6, "little")
+        try:
+            sock = self._socket()
+            self._drain(sock)
+            # Page Scan Repetition Mode R2, reserviert, kein Clock Offset.
+            sock.send(self._command(OPCODE_REMOTE_NAME_REQ, bdaddr + b"\x02\x00\x00\x00"))
+            result = self._await_name(sock, bdaddr, timeout)
+            if result is None:
+                sock.send(self._command(OPCODE_REMOTE_NAME_REQ_CANCEL, bdaddr))
+                # Auch nach dem Cancel kommt noch ein Complete-Event (Status 0x02).
+                # Bleibt es liegen, hält der nächste Probe es für seine Antwort.
+                done = self._await_name(sock, bdaddr, NAME_REQ_CANCEL_TIMEOUT, status_seen=True)
+                if done is None:
+                    logging.debug("Kein Abschluss nach Cancel für %s – Socket neu öffnen", mac)
+                    self.close()
+                    return False
+                # Der Name kann zwischen Timeout und Cancel noch angekommen sein.
+                return done
+            return result
+        except OSError as exc:
+            self.close()
+            if exc.errno in (errno.EPERM, errno.EACCES, errno.EAFNOSUPPORT):
+                logging.warning("HCI-Socket nicht nutzbar (%s) – nutze hcitool.", exc)
+                self._disabled = True
+            else:
+                logging.debug("HCI Remote Name Request für %s fehlgeschlagen: %s", mac, exc)
+            return None
+
+    @staticmethod
+    def _drain(sock) -> None:
+        while select.select([sock], [], [], 0)[0]:
+            sock.recv(260)
+
+    @staticmethod
+    def _await_name(sock, bdaddr: bytes, timeout: float, status_seen: bool = False):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                return None
+            packet = sock.recv(260)
+            if len(packet) < 3 or packet[0] != HCI_EVENT_PKT:
+                continue
+            event, params = packet[1], packet[3:]
+            if event == EVT_CMD_STATUS and len(params) >= 4:
+                status, _, opcode = struct.unpack_from("<BBH", params)
+                if opcode == OPCODE_REMOTE_NAME_REQ:
+                    if status != 0:
+                        return False
+                    status_seen = True
+            elif event == EVT_REMOTE_NAME_REQ_COMPLETE and len(params) >= 7:
+                # Ein Abschluss vor dem eigenen Command Status gehört zu einer
+                # früheren Anfrage.
+                if status_seen and params[1:7] == bdaddr:
+                    return params[0] == 0
@@ -0,0 +1,93 @@
+"""
+Gemeinsame Prozess- und Systemdiagnose für main.py und monitor_bt.py.
+"""
+
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+
+
+# Einmal geöffnet, danach per pread gelesen: kein open/close pro Messung.
+try:
+    _loadavg_fd = os.open("/proc/loadavg", os.O_RDONLY)
+except OSError:
+    _loadavg_fd = None
+
+# (monotonic-Zeitpunkt, Werte) der letzten Messung, als Ganzes ersetzt.
+_stats_cache: tuple[float, dict[str, float] | None] = (0.0, None)
+
+
+def collect_system_stats(max_age: float = 1.0) -> dict[str, float]:
+    global _stats_cache
+    now = time.monotonic()
+    measured_at, stats = _stats_cache
+    if stats is not None and now - measured_at < max_age:
+        return stats
+    stats = _measure_system_stats()
+    _stats_cache = (now, stats)
+    return stats
+
+
+def _load_averages() -> tuple[float, float, float]:
+    if _loadavg_fd is not None:
+        try:
+            fields = os.pread(_loadavg_fd, 64, 0).split()
+            return float(fields[0]), float(fields[1]), float(fields[2])
+        except (OSError, ValueError, IndexError):
+            pass
+    try:
+        return os.getloadavg()
+    except (OSError, AttributeError):
+        return 0.0, 0.0, 0.0
+
+
+def _measure_system_stats() -> dict[str, float]:
+    load1, load5, load15 = _load_averages()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    rss_mb = usage.ru_maxrss / 1024.0
+    return {
+        "load1": load1,
+        "load5": load5,
+        "load15": load15,
+        "cpu_utime": usage.ru_utime,
+        "rss_mb": rss_mb,
+        "threads": threading.active_count(),
+    }
+
+
+def hcitool_processes() -> list[str]:
+    # Direkt aus /proc statt per ps: kein fork/exec pro Presence-Zyklus.
+    lines = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as handle:
+                stat = handle.read()
+        except OSError:
+            continue  # Prozess inzwischen beendet
+        # Format: "pid (comm) state ..."; comm kann Leerzeichen enthalten.
+        open_paren = stat.find(b"(")
+        close_paren = stat.rfind(b")")
+        comm = stat[open_paren + 1:close_paren]
+        if comm != b"hcitool":
+            continue
+        state = stat[close_paren + 2:close_paren + 3].decode()
+        lines.append(f"{pid} {state} hcitool")
+    return lines
+
+
+def count_process_states(lines: list[str]) -> tuple[int, int, int]:
+    running = 0
+    zombies = 0
+    for line in lines:
+        parts = line.split(maxsplit=4)
+        stat = parts[1] if len(parts) > 1 else ""
+        if "Z" in stat:
+            zombies += 1
+        elif stat.startswith("R") or stat.startswith("D"):
+            running += 1
+    return len(lines), running, zombies
@@ -1,13 +1,22 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import array
+import atexit
+import hashlib
+import itertools
+import json
 import logging
+import os
+import shutil
 import subprocess
 import threading
 import time
-import os
-import resource
+
+from bluez import ClassicHciProber, create_client
+from diagnostics import collect_system_stats, count_process_states, hcitool_processes
 
 try:
-    from gpiozero import Button, LED, OutputDevice
+    from gpiozero import Button, DigitalOutputDevice, LED
 except ImportError:
     class _DummyGPIO:
         def __init__(self, *_, **__):
@@ -31,7 +40,12 @@ except ImportError:
         def is_pressed(self):
             return bool(self.state)
 
-    Button = LED = OutputDevice = _DummyGPIO
+    Button = DigitalOutputDevice = LED = _DummyGPIO
+
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
 
 
 BUTTONPIN = 5
@@ -54,6 +68,9 @@ mac_labels = {
 }
 
 scaninterval = 15
+# Sichtungen kommen schubweise; erst wenn der Scanner länger schweigt, wird
+# aktiv nachgefragt.
+passive_seen_window = scaninterval * 1.5
 relayclosetime = 0.5
 presencebeepduration = 0.1
 presencebeepcount = 3
@@ -66,19 +83,27 @@ active_probe_schedule = [
     (1.4, 1, 0.8),
 ]
 max_absent_failures = 2
-inter_device_pause = 2.7
+bluez_probe_timeout = 1.0
+diagnostics_interval = 60
+# Auf Mehrkern-Pis: Probes/Scanner und Webserver auf getrennten Kernen.
+worker_cores = {2, 3}
+server_cores = {0, 1}
 
 
+# Ausführliches Protokoll nur auf Wunsch: RPI_DEBUG=1 python main.py
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.DEBUG if os.environ.get("RPI_DEBUG") else logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
+# Zugriffslog pro /status-Abfrage ist nur Rauschen.
+logging.getLogger("werkzeug").setLevel(logging.WARNING)
+logging.getLogger("waitress").setLevel(logging.WARNING)
 
 app = Flask(__name__)
 
 led = LED(LEDPIN)
-relay = OutputDevice(RELAYPIN, active_high=False)
-buzzer = OutputDevice(BUZZERPIN, active_high=False)
+relay = DigitalOutputDevice(RELAYPIN, active_high=False)
+buzzer = DigitalOutputDevice(BUZZERPIN, active_high=False)
 button = Button(BUTTONPIN, pull_up=True, bounce_time=buttonbouncetime)
 
 GPIO_INFO = [
@@ -88,13 +113,75 @@ GPIO_INFO = [
     {"name": "Taster", "pin": BUTTONPIN, "role": "Manuelle Öffnung", "device": button},
 ]
 
+# state_lock schützt nur die Sammelaktualisierung in presence_monitor.
+# Einzelne Lese-/Schreibzugriffe auf Bool- oder Array-Einträge sind unter dem
+# GIL atomar und kommen ohne Lock aus.
 state_lock = threading.Lock()
-device_states = {mac: False for mac in macaddresses}
-devicepresent = False
-device_last_success = {mac: 0.0 for mac in macaddresses}
-device_failure_counts = {mac: 0 for mac in macaddresses}
-device_last_result = {mac: "never" for mac in macaddresses}
+state_changed = threading.Condition(state_lock)
+rescan_requested = False
+stopping = False
+# Bit i gesetzt = macaddresses[i] anwesend. Wird nur von presence_monitor
+# mit einer einzigen Zuweisung geschrieben, Leser sehen so immer einen
+# konsistenten Stand.
+present_bits = 0
+# Gerätezustand als parallele Arrays, Index i gehört zu macaddresses[i].
+mac_index = {mac: i for i, mac in enumerate(macaddresses)}
+device_last_success = array.array("d", [0.0] * len(macaddresses))
+device_failure_counts = array.array("B", [0] * len(macaddresses))
+# time.monotonic() der letzten Sichtung; unberührt von NTP-Sprüngen.
+device_last_seen = array.array("d", [float("-inf")] * len(macaddresses))
+# Unveränderliche Sicht pro Zyklus für /status: (present, failures,
+# last_success, last_result) je Index. Wird nur als Ganzes ersetzt.
+device_snapshot = ((False, 0, 0.0, "never"),) * len(macaddresses)
 current_probe_target = None
+probing_macs = set()
+# Revision des /status-Inhalts, dient als ETag. itertools.count liefert den
+# nächsten Wert atomar, auch wenn mehrere Threads gleichzeitig zählen. Der
+# Startzeitpunkt im Präfix verhindert Treffer auf ETags eines früheren Laufs.
+_status_revisions = itertools.count(1)
+_status_etag_prefix = format(int(time.time()), "x")
+status_rev = 0
+# (Revision, JSON-Bytes) – wird als Ganzes ersetzt. Der Body enthält nur
+# Werte, die sich allein mit status_rev ändern; Systemwerte liefert /system.
+_status_cache = (-1, b"")
+_relay_lock = threading.Lock()
+_relay_busy_until = 0.0
+
+# Absoluter Pfad, einmal aufgelöst: subprocess startet per vfork/posix_spawn
+# ohne PATH-Suche, und ein fehlendes hcitool wird nur einmal gemeldet.
+hcitool_path = shutil.which("hcitool")
+if hcitool_path is None:
+    logging.warning("hcitool nicht gefunden – Remote Name Request nur über den HCI-Socket.")
+# RPI_SCAN_MODE=bluetoothctl erzwingt die bluetoothctl-Sitzung statt D-Bus.
+bluez = create_client(macaddresses, os.environ.get("RPI_SCAN_MODE") or "auto")
+hci_prober = ClassicHciProber()
+
+# Pro Gerät ein Worker; die eigentlichen hcitool-Pages laufen trotzdem
+# nacheinander, da der Controller immer nur eine Page gleichzeitig ausführt.
+_probe_pool = ThreadPoolExecutor(max_workers=len(macaddresses), thread_name_prefix="probe")
+_page_lock = threading.Lock()
+atexit.register(_probe_pool.shutdown, wait=False, cancel_futures=True)
+
+
+def _expand_probe_schedule(schedule) -> tuple:
+    # (Stufe, Versuch, Timeout, Pause danach); nach dem letzten Versuch keine Pause.
+    plan = [
+        (stage, attempt, timeout, pause)
+        for stage, (timeout, attempts, pause) in enumerate(schedule, start=1)
+        for attempt in range(1, attempts + 1)
+    ]
+    if plan:
+        stage, attempt, timeout, _ = plan[-1]
+        plan[-1] = (stage, attempt, timeout, 0.0)
+    return tuple(plan)
+
+
+_probe_plan = _expand_probe_schedule(active_probe_schedule)
+
+
+def touch_status() -> None:
+    global status_rev
+    status_rev = next(_status_revisions)
 
 
 def _run_command(cmd, timeout=None):
@@ -102,13 +189,14 @@ def _run_command(cmd, timeout=None):
         return subprocess.run(
             cmd,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+            # stderr wird nur im Debug-Log ausgegeben.
+            stderr=subprocess.PIPE if logging.root.isEnabledFor(logging.DEBUG) else subprocess.DEVNULL,
             check=False,
             timeout=timeout,
         )
     except subprocess.TimeoutExpired:
-        logging.debug("Timeout für Kommando: %s", " ".join(cmd))
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug("Timeout für Kommando: %s", " ".join(cmd))
         return None
     except FileNotFoundError as exc:
         logging.error("Befehl %s nicht gefunden.", exc.filename or cmd[0])
@@ -118,71 +206,100 @@ def _run_command(cmd, timeout=None):
         return None
 
 
-def active_probe(mac: str) -> bool:
+def request_rescan() -> None:
+    global rescan_requested
+    with state_changed:
+        rescan_requested = True
+        state_changed.notify_all()
+
+
+def stop_presence_monitor() -> None:
+    global stopping
+    with state_changed:
+        stopping = True
+        state_changed.notify_all()
+
+
+def on_device_seen(mac: str) -> None:
+    now = time.monotonic()
+    i = mac_index[mac]
+    previous = device_last_seen[i]
+    device_last_seen[i] = now
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug("BlueZ meldet Sichtung von %s", mac)
+    # Nur ein Gerät, das länger nicht gesehen wurde, weckt presence_monitor;
+    # laufende RSSI-Updates eines anwesenden Geräts lösen keinen Zyklus aus.
+    if now - previous > passive_seen_window:
+        request_rescan()
+
+
+def _hcitool_name(mac: str, timeout: float, debug: bool) -> bool:
+    if hcitool_path is None:
+        return False
+    res = _run_command([hcitool_path, "name", mac], timeout=timeout)
+    if res is None:
+        return False
+    if res.stderr and debug:
+        logging.debug("hcitool stderr (%s): %s", mac, res.stderr.decode(errors="replace").strip())
+    name = res.stdout.strip()
+    if name and res.returncode == 0:
+        if debug:
+            logging.debug("hcitool Name für %s: %s", mac, name.decode(errors="replace"))
+        return True
+    return False
+
 
-    for stage, (timeout, attempts, pause) in enumerate(active_probe_schedule, start=1):
-        for attempt in range(1, attempts + 1):
+def active_probe(mac: str) -> bool:
+    debug = logging.root.isEnabledFor(logging.DEBUG)
+    age = time.monotonic() - device_last_seen[mac_index[mac]]
+    if age <= passive_seen_window:
+        if debug:
+            logging.debug("%s vor %.1fs passiv gesehen – keine Probe nötig", mac, age)
+        return True
+    if debug:
+        logging.debug("%s seit %.1fs nicht passiv gesehen – aktive Probe", mac, age)
+
+    if bluez.probe(mac, bluez_probe_timeout):
+        if debug:
+            logging.debug("Aktive Probe erfolgreich via BlueZ D-Bus für %s", mac)
+        return True
+
+    for stage, attempt, timeout, pause in _probe_plan:
+        if debug:
             logging.debug(
-                "Aktive Probe Stufe %d Versuch %d via hcitool name für %s (Timeout %.1fs)",
+                "Aktive Probe Stufe %d Versuch %d via Remote Name Request für %s (Timeout %.1fs)",
                 stage,
                 attempt,
                 mac,
                 timeout,
             )
-            res = _run_command(["hcitool", "name", mac], timeout=timeout)
-            if res is not None:
-                if res.stderr:
-                    logging.debug("hcitool stderr (%s): %s", mac, res.stderr.strip())
-                if res.stdout and res.returncode == 0:
-                    logging.debug(
-                        "Aktive Probe erfolgreich via hcitool für %s: %s",
-                        mac,
-                        res.stdout.strip(),
-                    )
-                    return True
-
-            if attempt < attempts:
-                time.sleep(pause)
-        if stage < len(active_probe_schedule):
+        with _page_lock:
+            found = hci_prober.probe(mac, timeout)
+            if found is None:
+                found = _hcitool_name(mac, timeout, debug)
+        if found:
+            if debug:
+                logging.debug("Aktive Probe erfolgreich via Remote Name Request für %s", mac)
+            return True
+
+        if pause:
             time.sleep(pause)
-    logging.debug("Aktive Probe endgültig fehlgeschlagen für %s", mac)
+    if debug:
+        logging.debug("Aktive Probe endgültig fehlgeschlagen für %s", mac)
     return False
 
 
 def log_hcitool_processes() -> None:
     try:
-        res = subprocess.run(
-            ["ps", "-eo", "pid,stat,comm"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True,
-        )
+        lines = hcitool_processes()
     except FileNotFoundError:
-        logging.debug("ps Befehl nicht verfügbar – Prozessdiagnose übersprungen.")
+        logging.debug("/proc nicht verfügbar – Prozessdiagnose übersprungen.")
         return
     except Exception as exc:
         logging.debug("Prozessdiagnose fehlgeschlagen: %s", exc)
         return
 
-    total = 0
-    running = 0
-    zombies = 0
-    lines = res.stdout.strip().splitlines()
-    for line in lines[1:]:
-        if "hcitool" not in line:
-            continue
-        total += 1
-        parts = line.split()
-        if len(parts) >= 2:
-            stat = parts[1]
-        else:
-            stat = ""
-        if "Z" in stat:
-            zombies += 1
-        elif stat.startswith("R") or stat.startswith("D"):
-            running += 1
-
+    total, running, zombies = count_process_states(lines)
     if total:
         msg = f"hcitool Prozesse aktiv: {total} (running: {running}, zombies: {zombies})"
         if zombies or running > 1:
@@ -191,23 +308,6 @@ def log_hcitool_processes() -> None:
             logging.debug("%s", msg)
 
 
-def collect_system_stats() -> dict:
-    try:
-        load1, load5, load15 = os.getloadavg()
-    except (OSError, AttributeError):
-        load1 = load5 = load15 = 0.0
-    usage = resource.getrusage(resource.RUSAGE_SELF)
-    rss_mb = usage.ru_maxrss / 1024.0
-    return {
-        "load1": load1,
-        "load5": load5,
-        "load15": load15,
-        "cpu_utime": usage.ru_utime,
-        "rss_mb": rss_mb,
-        "threads": len(threading.enumerate()),
-    }
-
-
 def log_system_stats() -> None:
     stats = collect_system_stats()
     logging.debug(
@@ -220,112 +320,159 @@ def log_system_stats() -> None:
         stats["threads"],
     )
 
+
+def heartbeat() -> None:
+    # Diagnose läuft getrennt vom Presence-Zyklus in festem Takt.
+    lower_thread_priority()
+    while True:
+        log_hcitool_processes()
+        log_system_stats()
+        time.sleep(diagnostics_interval)
+
+
+def pin_current_thread(cores) -> None:
+    # Linux wendet die Affinität nur auf den aufrufenden Thread an; neue
+    # Threads und Kindprozesse erben sie. Auf Einkern-Pis bleibt alles wie es ist.
+    try:
+        usable = set(cores) & os.sched_getaffinity(0)
+        if usable:
+            os.sched_setaffinity(0, usable)
+    except (AttributeError, OSError) as exc:
+        logging.debug("CPU-Affinität nicht gesetzt: %s", exc)
+
+
+def lower_thread_priority(increment: int = 5) -> None:
+    try:
+        tid = threading.get_native_id()
+        os.setpriority(os.PRIO_PROCESS, tid, os.getpriority(os.PRIO_PROCESS, tid) + increment)
+    except (AttributeError, OSError) as exc:
+        logging.debug("Thread-Priorität nicht gesenkt: %s", exc)
+
+
 def beep(times: int, duration: float) -> None:
-    for _ in range(times):
-        buzzer.on()
-        time.sleep(duration)
-        buzzer.off()
-        time.sleep(duration)
+    # Das Timing übernimmt gpiozero im Hintergrund; presence_monitor wartet nicht.
+    buzzer.blink(on_time=duration, off_time=duration, n=times, background=True)
+
+
+def pulse_relay() -> None:
+    # Einmaliger Impuls im gpiozero-Hintergrund-Thread; läuft bereits einer,
+    # wird der zweite Auslöser verworfen.
+    global _relay_busy_until
+    now = time.monotonic()
+    with _relay_lock:
+        if now < _relay_busy_until:
+            return
+        _relay_busy_until = now + relayclosetime
+        relay.blink(on_time=relayclosetime, off_time=0, n=1, background=True)
+    touch_status()
+    timer = threading.Timer(relayclosetime, touch_status)
+    timer.daemon = True
+    timer.start()
 
 
 def button_pressed() -> None:
-    with state_lock:
-        open_allowed = devicepresent
-    if open_allowed:
-        relay.on()
-        time.sleep(relayclosetime)
-        relay.off()
+    if present_bits:
+        pulse_relay()
+    # Nach einer Betätigung die Anwesenheit sofort neu prüfen.
+    request_rescan()
 
 
-def blink_led() -> None:
-    while True:
-        with state_lock:
-            present = devicepresent
-        interval = presenceledblinkinterval if present else absenceledblinkinterval
-        led.on()
-        time.sleep(0.2)
-        led.off()
-        time.sleep(interval)
+def show_presence(present: bool) -> None:
+    # gpiozero blinkt im eigenen Hintergrund-Thread weiter; neu gesetzt wird
+    # nur bei einem Statuswechsel.
+    interval = presenceledblinkinterval if present else absenceledblinkinterval
+    led.blink(on_time=0.2, off_time=interval, background=True)
 
 
 def presence_monitor() -> None:
-    global devicepresent, current_probe_target
+    global present_bits, device_snapshot, current_probe_target, rescan_requested
+    # Die Probe-Worker entstehen erst hier und erben die Kerne.
+    pin_current_thread(worker_cores)
     previous_presence = None
     order = list(macaddresses)
     start_index = 0
     monitored_mac = None
 
-    while True:
-        cycle_start = time.time()
-        logging.debug("Presence-Zyklus gestartet (now=%.3f)", cycle_start)
+    while not stopping:
+        cycle_start = time.monotonic()
+        debug = logging.root.isEnabledFor(logging.DEBUG)
+        if debug:
+            logging.debug("Presence-Zyklus gestartet (now=%.3f)", time.time())
         results = {mac: None for mac in order}
 
         if monitored_mac is None:
-            logging.debug("Kein aktives Gerät – starte Suche")
+            if debug:
+                logging.debug("Kein aktives Gerät – starte parallele Suche")
+            current_probe_target = None
+            probing_macs.update(order)
+            touch_status()
+            futures = {_probe_pool.submit(active_probe, mac): mac for mac in order}
+            for future in as_completed(futures):
+                mac = futures[future]
+                results[mac] = future.result()
+                probing_macs.discard(mac)
+                touch_status()
             next_monitored = None
             for step in range(len(order)):
                 mac = order[(start_index + step) % len(order)]
-                logging.debug("Starte aktive Prüfung für %s", mac)
-                with state_lock:
-                    current_probe_target = mac
-                success = active_probe(mac)
-                results[mac] = success
-                if success:
+                if results[mac]:
                     next_monitored = mac
-                    logging.debug("%s als aktives Gerät übernommen", mac)
+                    if debug:
+                        logging.debug("%s als aktives Gerät übernommen", mac)
                     break
-                if step < len(order) - 1:
-                    time.sleep(inter_device_pause)
             start_index = (start_index + 1) % len(order)
         else:
-            logging.debug("Prüfe ausschließlich aktives Gerät %s", monitored_mac)
-            with state_lock:
-                current_probe_target = monitored_mac
+            if debug:
+                logging.debug("Prüfe ausschließlich aktives Gerät %s", monitored_mac)
+            current_probe_target = monitored_mac
             success = active_probe(monitored_mac)
             results[monitored_mac] = success
             next_monitored = monitored_mac
 
         now = time.time()
         status_lines = []
-        with state_lock:
-            for mac in order:
-                success = results.get(mac)
-                if success:
-                    device_states[mac] = True
-                    device_failure_counts[mac] = 0
-                    device_last_success[mac] = now
-                    device_last_result[mac] = "hit"
-                    next_monitored = mac
-                else:
-                    if success is False:
-                        device_failure_counts[mac] += 1
-                        device_failure_counts[mac] = min(
-                            device_failure_counts[mac], max_absent_failures + 1
-                        )
-                        device_last_result[mac] = "miss"
-                        if (
-                            device_failure_counts[mac] > max_absent_failures
-                            and mac == next_monitored
-                        ):
-                            device_states[mac] = False
-                            next_monitored = None
-                    else:
-                        device_last_result[mac] = "skip"
-                    if mac != next_monitored:
-                        device_states[mac] = False
-                state = device_states[mac]
-                fails = device_failure_counts[mac]
-                last_success = device_last_success[mac]
-                if last_success:
-                    delta = now - last_success
-                    note = f"{delta:.1f}s seit Erfolg"
+        present_macs = []
+        snapshot = []
+        # Nur presence_monitor schreibt diesen Zustand: alles wird ohne Lock
+        # berechnet, unter state_lock folgen nur die Zuweisungen.
+        bits = present_bits
+        for i, mac in enumerate(order):
+            bit = 1 << i
+            success = results[mac]
+            fails = device_failure_counts[i]
+            last_success = device_last_success[i]
+            if success:
+                bits |= bit
+                fails = 0
+                last_success = now
+                result_label = "hit"
+                device_last_success[i] = now
+            else:
+                if success is False:
+                    fails = min(fails + 1, max_absent_failures + 1)
+                    result_label = "miss"
+                    if fails > max_absent_failures and mac == next_monitored:
+                        bits &= ~bit
+                        next_monitored = None
                 else:
-                    note = "keine Messung"
-                result_label = device_last_result[mac]
-                note = f"{note}, {result_label}, fails={fails}"
-                status_lines.append(
-                    f"{mac} → {'PRESENT' if state else 'ABSENT'} ({note})"
-                )
+                    result_label = "skip"
+                if mac != next_monitored:
+                    bits &= ~bit
+            device_failure_counts[i] = fails
+            state = bool(bits & bit)
+            if state:
+                present_macs.append(mac)
+            if last_success:
+                delta = now - last_success
+                note = f"{delta:.1f}s seit Erfolg"
+            else:
+                note = "keine Messung"
+            snapshot.append((state, fails, last_success, result_label))
+            note = f"{note}, {result_label}, fails={fails}"
+            status_lines.append(
+                f"{mac} → {'PRESENT' if state else 'ABSENT'} ({note})"
+            )
+            if debug:
                 logging.debug(
                     "Bewertung %s → state=%s, result=%s, fails=%d, last_success=%.3f",
                     mac,
@@ -334,10 +481,13 @@ def presence_monitor() -> None:
                     fails,
                     last_success,
                 )
-            devicepresent = any(device_states.values())
-            current_presence = devicepresent
-            present_macs = [mac for mac, state in device_states.items() if state]
+
+        with state_lock:
+            present_bits = bits
+            device_snapshot = tuple(snapshot)
+            current_presence = bool(bits)
             current_probe_target = next_monitored
+            touch_status()
 
         monitored_mac = next_monitored
         logging.info("Statusübersicht: %s", " | ".join(status_lines))
@@ -346,8 +496,8 @@ def presence_monitor() -> None:
             ", ".join(present_macs) if present_macs else "keine Geräte",
         )
 
-        log_hcitool_processes()
         if current_presence != previous_presence:
+            show_presence(current_presence)
             if current_presence:
                 beep(presencebeepcount, presencebeepduration)
                 logging.info("Statuswechsel → Presence")
@@ -356,10 +506,13 @@ def presence_monitor() -> None:
                 logging.info("Statuswechsel → Absence")
             previous_presence = current_presence
 
-        elapsed = time.time() - cycle_start
+        elapsed = time.monotonic() - cycle_start
         sleep_time = scaninterval - elapsed
         if sleep_time > 0:
-            time.sleep(sleep_time)
+            with state_changed:
+                if state_changed.wait_for(lambda: rescan_requested or stopping, sleep_time):
+                    logging.debug("Neuer Scan angefordert – Presence-Zyklus startet vorzeitig")
+                rescan_requested = False
         else:
             logging.warning(
                 "Presence-Zyklus überschreitet scaninterval (elapsed=%.3f, interval=%.3f)",
@@ -368,72 +521,130 @@ def presence_monitor() -> None:
             )
 
 
+# Die Startseite hängt nur von der Konfiguration ab und wird einmal gerendert.
+with app.app_context():
+    _index_html = render_template(
+        "index.html", macaddresses=macaddresses, mac_labels=mac_labels
+    ).encode()
+_index_etag = hashlib.sha1(_index_html).hexdigest()
+
+
 @app.route("/")
 def index():
-    return render_template("index.html", macaddresses=macaddresses, mac_labels=mac_labels)
+    if request.if_none_match.contains(_index_etag):
+        response = Response(status=304)
+    else:
+        response = Response(_index_html, mimetype="text/html")
+    response.set_etag(_index_etag)
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+
+def build_status_payload() -> dict:
+    devices = {}
+    snapshot = device_snapshot
+    for mac, (present, failures, last_success, last_result) in zip(macaddresses, snapshot):
+        devices[mac] = {
+            "present": present,
+            "failures": failures,
+            "last_success": last_success,
+            "last_result": last_result,
+            "probing": mac == current_probe_target or mac in probing_macs,
+        }
+    gpio = []
+    for info in GPIO_INFO:
+        device = info["device"]
+        if isinstance(device, Button):
+            value = bool(device.is_pressed)
+        else:
+            try:
+                value = bool(device.value)
+            except AttributeError:
+                value = False
+        gpio.append(
+            {
+                "name": info["name"],
+                "pin": info["pin"],
+                "role": info["role"],
+                "active": value,
+            }
+        )
+    payload = {
+        "devices": devices,
+        "any_present": any(entry[0] for entry in snapshot),
+        "current_probe": current_probe_target,
+        "gpio": gpio,
+    }
+    return payload
 
 
 @app.route("/status")
 def status():
-    now = time.time()
-    with state_lock:
-        devices = {}
-        for mac in macaddresses:
-            last_success = device_last_success[mac]
-            since = now - last_success if last_success else None
-            devices[mac] = {
-                "present": device_states[mac],
-                "failures": device_failure_counts[mac],
-                "last_success": last_success,
-                "since_last_success": since,
-                "last_result": device_last_result[mac],
-                "probing": mac == current_probe_target,
-            }
-        gpio = []
-        for info in GPIO_INFO:
-            device = info["device"]
-            if isinstance(device, Button):
-                value = bool(device.is_pressed)
-            else:
-                try:
-                    value = bool(device.value)
-                except AttributeError:
-                    value = False
-            gpio.append(
-                {
-                    "name": info["name"],
-                    "pin": info["pin"],
-                    "role": info["role"],
-                    "active": value,
-                }
-            )
-        payload = {
-            "devices": devices,
-            "any_present": devicepresent,
-            "current_probe": current_probe_target,
-            "system": collect_system_stats(),
-            "gpio": gpio,
-            "timestamp": now,
-        }
-    return jsonify(payload)
+    global _status_cache
+    rev = status_rev
+    etag = f"{_status_etag_prefix}-{rev}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    cached_rev, body = _status_cache
+    if cached_rev != rev:
+        body = json.dumps(build_status_payload()).encode()
+        _status_cache = (rev, body)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Browser sollen jedes Mal mit If-None-Match nachfragen.
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/system")
+def system():
+    # Systemwerte ändern sich laufend und bleiben darum außerhalb des
+    # /status-Caches. server_time erlaubt der Seite, "seit Erfolg" selbst zu
+    # rechnen, ohne sich auf die Uhr des Browsers zu verlassen.
+    payload = dict(collect_system_stats(), server_time=time.time())
+    response = Response(json.dumps(payload), mimetype="application/json")
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 @app.route("/activaterelay")
 def activaterelay():
-    relay.on()
-    time.sleep(relayclosetime)
-    relay.off()
+    pulse_relay()
+    request_rescan()
     return "Relay activated!"
 
 
 button.when_pressed = button_pressed
 
 
+def start_scanner() -> None:
+    # Läuft in einem eigenen, auf worker_cores gepinnten Thread: Reader-,
+    # D-Bus- und HCI-Threads sowie das bluetoothctl-Kind erben die Maske.
+    pin_current_thread(worker_cores)
+    if bluez.start():
+        bluez.start_discovery(on_device_seen)
+        atexit.register(bluez.stop)
+
+
 def start_threads() -> None:
+    scanner_starter = threading.Thread(target=start_scanner, name="scanner-start")
+    scanner_starter.start()
+    # Discovery muss stehen, bevor presence_monitor die erste Probe schickt.
+    scanner_starter.join()
+    show_presence(False)
+    threading.Thread(target=heartbeat, daemon=True).start()
     threading.Thread(target=presence_monitor, daemon=True).start()
-    threading.Thread(target=blink_led, daemon=True).start()
+    atexit.register(stop_presence_monitor)
 
 
 if __name__ == "__main__":
     start_threads()
-    app.run(host="0.0.0.0", port=5000)
+    pin_current_thread(server_cores)
+    if serve is not None:
+        serve(app, host="0.0.0.0", port=5000, threads=4, connection_limit=32)
+    else:
+        logging.warning("waitress nicht installiert – nutze Flask-Entwicklungsserver.")
+        app.run(host="0.0.0.0", port=5000, threaded=True)
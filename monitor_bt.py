@@ -13,15 +13,16 @@ Logs werden in logs/monitor.log rotierend geschrieben. Jede Minute werden:
 
 from __future__ import annotations
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
-import os
-import resource
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import queue
 import subprocess
-import threading
 import time
 from pathlib import Path
 
+from diagnostics import collect_system_stats, count_process_states, hcitool_processes
+
 LOG_DIR = Path(__file__).resolve().parent / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = LOG_DIR / "monitor.log"
@@ -29,6 +30,15 @@ LOG_FILE = LOG_DIR / "monitor.log"
 INTERVAL_SECONDS = 60
 DMESG_INTERVAL = 5  # jede fünfte Runde dmesg protokollieren
 
+BLUETOOTH_COMMANDS = (
+    (logging.INFO, "hciconfig hci0 stats"),
+    (logging.DEBUG, "hciconfig hci0"),
+    (logging.DEBUG, "hcitool con"),
+    (logging.DEBUG, "bluetoothctl show"),
+)
+SECTION_MARKER = "---SEP---"
+COMMAND_TIMEOUT = 5
+
 
 def setup_logger() -> logging.Logger:
     logger = logging.getLogger("bt-monitor")
@@ -45,7 +55,13 @@ def setup_logger() -> logging.Logger:
         datefmt="%Y-%m-%d %H:%M:%S",
     )
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # Schreiben und Rotieren übernimmt ein Listener-Thread; der Messthread
+    # legt die Einträge nur in die Queue.
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
     logger.propagate = False
     return logger
 
@@ -71,45 +87,17 @@ def run_command(command: list[str] | str, *, timeout: float | None = None, shell
         return f"Fehler bei {cmd_display}: {exc}"
 
 
-def collect_system_stats() -> dict[str, float]:
-    try:
-        load1, load5, load15 = os.getloadavg()
-    except (OSError, AttributeError):
-        load1 = load5 = load15 = 0.0
-    usage = resource.getrusage(resource.RUSAGE_SELF)
-    rss_mb = usage.ru_maxrss / 1024.0
-    return {
-        "load1": load1,
-        "load5": load5,
-        "load15": load15,
-        "cpu_utime": usage.ru_utime,
-        "rss_mb": rss_mb,
-        "threads": len(threading.enumerate()),
-        "uptime": time.time(),
-    }
-
-
 def log_hcitool_processes() -> None:
-    output = run_command(["ps", "-eo", "pid,stat,pcpu,pmem,comm"])
-    lines = output.strip().splitlines()
-    total = 0
-    running = 0
-    zombies = 0
-    details: list[str] = []
-    for line in lines[1:]:
-        if "hcitool" not in line:
-            continue
-        total += 1
-        parts = line.split(maxsplit=4)
-        stat = parts[1] if len(parts) > 1 else ""
-        cpu = parts[2] if len(parts) > 2 else "?"
-        mem = parts[3] if len(parts) > 3 else "?"
-        if "Z" in stat:
-            zombies += 1
-        elif stat.startswith("R") or stat.startswith("D"):
-            running += 1
-        details.append(f"{line.strip()}")
+    try:
+        details = hcitool_processes()
+    except FileNotFoundError:
+        LOGGER.debug("/proc nicht verfügbar – Prozessdiagnose übersprungen.")
+        return
+    except OSError as exc:
+        LOGGER.debug("Prozessdiagnose fehlgeschlagen: %s", exc)
+        return
 
+    total, running, zombies = count_process_states(details)
     if total:
         level = logging.WARNING if zombies or running > 1 else logging.INFO
         LOGGER.log(
@@ -126,22 +114,21 @@ def log_hcitool_processes() -> None:
 
 
 def log_bluetooth_stats() -> None:
-    LOGGER.info(
-        "hciconfig hci0 stats:\n%s",
-        run_command(["hciconfig", "hci0", "stats"], timeout=5).strip(),
-    )
-    LOGGER.debug(
-        "hciconfig hci0:\n%s",
-        run_command(["hciconfig", "hci0"], timeout=5).strip(),
-    )
-    LOGGER.debug(
-        "hcitool con:\n%s",
-        run_command(["hcitool", "con"], timeout=5).strip(),
-    )
-    LOGGER.debug(
-        "bluetoothctl show:\n%s",
-        run_command(["bluetoothctl", "show"], timeout=5).strip(),
+    # Alle Abfragen in einer Shell: ein fork statt vier. Kommandos, deren
+    # Level gerade nicht geloggt wird, laufen gar nicht erst.
+    commands = [(level, cmd) for level, cmd in BLUETOOTH_COMMANDS if LOGGER.isEnabledFor(level)]
+    if not commands:
+        return
+    # Eigener Timeout je Kommando: ein hängendes bluetoothctl (bluetoothd weg)
+    # kostet nur seinen Abschnitt, nicht die ganze Ausgabe.
+    script = f"; echo {SECTION_MARKER}; ".join(
+        f"timeout {COMMAND_TIMEOUT} {cmd}; [ $? -eq 124 ] && echo 'Timeout nach {COMMAND_TIMEOUT}s'"
+        for _, cmd in commands
     )
+    output = run_command(script, timeout=COMMAND_TIMEOUT * len(commands) + 5, shell=True)
+    sections = output.split(SECTION_MARKER + "\n")
+    for (level, cmd), output in zip(commands, sections):
+        LOGGER.log(level, "%s:\n%s", cmd, output.strip())
 
 
 def log_dmesg_tail() -> None: